@@ -6,15 +6,26 @@ This version uses Groq API instead of OpenAI
 
 from fastapi import FastAPI, UploadFile, File, HTTPException, Form, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.middleware.gzip import DEFAULT_EXCLUDED_CONTENT_TYPES
+from fastapi.responses import JSONResponse, StreamingResponse
 import tempfile
 import os
-from typing import List, Dict, Optional
+import sys
+from typing import List, Dict, Optional, Tuple, Final
 import json
+import hashlib
+import uuid
 import asyncio
+import concurrent.futures
+import multiprocessing
 import logging
 from pydantic import BaseModel
 import time
+from types import MappingProxyType
+from collections import OrderedDict
+import msgpack
+import redis.asyncio as aioredis
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -23,10 +34,11 @@ logger = logging.getLogger(__name__)
 # Import your existing classes
 try:
     from pipeline import (
-        GroqClient, EnhancedPDFProcessor, SummaryAgent, 
+        GroqClient, RateLimiter, EnhancedPDFProcessor, SummaryAgent, 
         FlashcardAgent, QuizAgent, EnhancedResearchDiscoveryAgent, 
         YouTubeDiscoveryAgent, WebResourceAgent
     )
+    from pdf_extraction import extract_pdf_page
     logger.info("✅ Successfully imported pipeline modules")
 except ImportError as e:
     logger.error(f"❌ Failed to import pipeline modules: {e}")
@@ -54,6 +66,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress larger JSON payloads (flashcards, quizzes, discovery lists); SSE and NDJSON
+# streams are left uncompressed so each chunk reaches the client as soon as it is sent
+app.add_middleware(
+    GZipMiddleware,
+    minimum_size=1024,
+    exclude_content_types=DEFAULT_EXCLUDED_CONTENT_TYPES + ("application/x-ndjson",)
+)
+
 # Pydantic models for API responses
 class ProcessingStatus(BaseModel):
     status: str
@@ -62,19 +82,33 @@ class ProcessingStatus(BaseModel):
     page_count: int
     methods_used: List[str]
 
+class Flashcard(BaseModel):
+    question: str
+    answer: str
+    difficulty: str = "Basic"
+    category: str = "General"
+    hint: str = ""
+
+class QuizQuestion(BaseModel):
+    question: str
+    options: List[str]
+    correct_answer: int
+    explanation: str = ""
+    difficulty: str = "Basic"
+
 class SummaryResponse(BaseModel):
     summary: str
     status: str
     fallback_used: bool = False
 
 class FlashcardResponse(BaseModel):
-    flashcards: List[Dict]
+    flashcards: List[Flashcard]
     count: int
     status: str
     fallback_used: bool = False
 
 class QuizResponse(BaseModel):
-    quiz: List[Dict]
+    quiz: List[QuizQuestion]
     count: int
     status: str
     fallback_used: bool = False
@@ -94,6 +128,12 @@ class WebResourcesResponse(BaseModel):
     count: int
     status: str
 
+class DiscoveryResponse(BaseModel):
+    papers: List[Dict]
+    videos: List[Dict]
+    resources: List[Dict]
+    status: str
+
 class QuestionRequest(BaseModel):
     question: str
     document_text: str
@@ -109,17 +149,214 @@ class ApiStatusResponse(BaseModel):
     message: str
     fallback_enabled: bool
 
+class HealthResponse(BaseModel):
+    status: str
+    pdf_processor: bool
+    ai_agents_initialized: bool
+    groq_api_available: bool
+    groq_key_configured: bool
+    fallback_mode: bool
+    active_sessions: int
+    consecutive_api_failures: int
+
+class DeepHealthResponse(BaseModel):
+    status: str
+    groq_api_available: bool
+    quota_exceeded: bool
+    latency_ms: int
+    consecutive_api_failures: int
+
+class ClearSessionResponse(BaseModel):
+    message: str
+    status: str
+
+class SessionInfoResponse(BaseModel):
+    active: bool
+    message: Optional[str] = None
+    file_info: Optional[str] = None
+    filename: Optional[str] = None
+    word_count: Optional[int] = None
+    page_count: Optional[int] = None
+    methods_used: Optional[List[str]] = None
+    api_status: Optional[Dict] = None
+
+class QuotaCheckResponse(BaseModel):
+    api_available: bool
+    quota_exceeded: bool
+    consecutive_failures: int
+    last_check: float
+    message: str
+    fallback_features: List[str]
+
+# Size of the default executor used by asyncio.to_thread (per uvicorn worker)
+THREAD_POOL_SIZE = int(os.getenv("THREAD_POOL_SIZE", "64"))
+MAX_PDF_PAGES = 20
+MAX_UPLOAD_SIZE = 50 * 1024 * 1024  # 50MB limit
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Per-endpoint text limits; truncated copies are stored on the session at upload time
+TRUNCATION_LIMITS = {
+    "summary": 8000,
+    "flashcards": 6000,
+    "quiz": 6000,
+    "keywords": 6000
+}
+# AI generation results cached per worker, keyed on endpoint + content hash + params
+RESULT_CACHE_SIZE = 256
+RESULT_CACHE_TTL = 3600
+# Sessions live in Redis when REDIS_URL is set so any worker can serve any request
+REDIS_URL = os.getenv("REDIS_URL")
+SESSION_TTL = int(os.getenv("SESSION_TTL", "3600"))
+# Upper bound for one API status probe (a single attempt, no retries)
+API_PROBE_TIMEOUT = 10.0
+# Multiple workers only share sessions through Redis, so default to one without it.
+# RELOAD=1 enables auto-reload for development (uvicorn then runs a single worker).
+# Set WORKERS explicitly when launching uvicorn yourself: the Groq rate limit budget
+# (GROQ_RPM / GROQ_TPM) is split evenly between this many worker processes.
+RELOAD = os.getenv("RELOAD") == "1"
+WORKERS = 1 if RELOAD else int(os.getenv("WORKERS", "4" if REDIS_URL else "1"))
+# Number of processes used to extract PDF pages in parallel (per uvicorn worker);
+# by default the CPU cores are shared between workers rather than given to each
+PROCESS_POOL_SIZE = int(os.getenv("PROCESS_POOL_SIZE", str(max((os.cpu_count() or 1) // WORKERS, 1))))
+
+class SessionStore:
+    """Study session storage.
+    
+    Uses a Redis hash per session (each field msgpack-encoded, expiring
+    SESSION_TTL after it was last read or written) when a Redis URL is given,
+    otherwise an in-process dict. Redis sessions are also indexed in a sorted set
+    scored by expiry time, so counting them doesn't scan the keyspace.
+    """
+    
+    INDEX_KEY = "sessions:active"
+    
+    def __init__(self, redis_url: Optional[str] = None, ttl: int = SESSION_TTL):
+        self.ttl = ttl
+        self.redis = aioredis.from_url(redis_url) if redis_url else None
+        self.local_sessions = {}
+    
+    def _key(self, session_id: str) -> str:
+        return f"session:{session_id}"
+    
+    async def get(self, session_id: str, *fields: str) -> Optional[Dict]:
+        """Return the session (or only the requested fields), or None if it doesn't exist"""
+        if self.redis is None:
+            session = self.local_sessions.get(session_id)
+            if session is None or not fields:
+                return session
+            return {field: session.get(field) for field in fields}
+        
+        # Reading a session keeps it alive (sliding expiry)
+        key = self._key(session_id)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            if fields:
+                pipe.hmget(key, fields)
+            else:
+                pipe.hgetall(key)
+            pipe.expire(key, self.ttl)
+            # xx: only refresh sessions already in the index, never add missing ones
+            pipe.zadd(self.INDEX_KEY, {session_id: time.time() + self.ttl}, xx=True)
+            result, _, _ = await pipe.execute()
+        
+        if fields:
+            if all(value is None for value in result):
+                return None
+            packed = dict(zip(fields, result))
+        else:
+            packed = result
+            if not packed:
+                return None
+            packed = {field.decode(): value for field, value in packed.items()}
+        
+        return {field: msgpack.unpackb(value) if value is not None else None for field, value in packed.items()}
+    
+    async def set(self, session_id: str, data: Dict):
+        """Replace the session with `data`"""
+        if self.redis is None:
+            self.local_sessions[session_id] = dict(data)
+            return
+        
+        key = self._key(session_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(key)
+            pipe.hset(key, mapping={field: msgpack.packb(value) for field, value in data.items()})
+            pipe.expire(key, self.ttl)
+            pipe.zadd(self.INDEX_KEY, {session_id: time.time() + self.ttl})
+            await pipe.execute()
+    
+    async def update(self, session_id: str, upload_id: str, **fields) -> bool:
+        """Set individual fields on the session without rewriting the rest.
+        
+        Only writes if the session still holds the upload `upload_id`, so results
+        computed for a document that was since replaced or cleared are dropped.
+        Returns whether the fields were written.
+        """
+        if self.redis is None:
+            session = self.local_sessions.get(session_id)
+            if session is None or session.get("upload_id") != upload_id:
+                return False
+            session.update(fields)
+            return True
+        
+        key = self._key(session_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(key)
+                current = await pipe.hget(key, "upload_id")
+                if current is None or msgpack.unpackb(current) != upload_id:
+                    return False
+                pipe.multi()
+                pipe.hset(key, mapping={field: msgpack.packb(value) for field, value in fields.items()})
+                pipe.expire(key, self.ttl)
+                pipe.zadd(self.INDEX_KEY, {session_id: time.time() + self.ttl})
+                await pipe.execute()
+                return True
+            except aioredis.WatchError:
+                # The session changed between the check and the write
+                return False
+    
+    async def exists(self, session_id: str) -> bool:
+        if self.redis is None:
+            return session_id in self.local_sessions
+        return bool(await self.redis.exists(self._key(session_id)))
+    
+    async def delete(self, session_id: str) -> bool:
+        """Delete a session, returning whether it existed"""
+        if self.redis is None:
+            return self.local_sessions.pop(session_id, None) is not None
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(self._key(session_id))
+            pipe.zrem(self.INDEX_KEY, session_id)
+            deleted, _ = await pipe.execute()
+        return bool(deleted)
+    
+    async def count(self) -> int:
+        if self.redis is None:
+            return len(self.local_sessions)
+        # Drop index entries whose sessions have expired, then count the rest
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zremrangebyscore(self.INDEX_KEY, "-inf", time.time())
+            pipe.zcard(self.INDEX_KEY)
+            _, active = await pipe.execute()
+        return active
+
 # Global variables to store state
-study_sessions = {}
+study_sessions = SessionStore(REDIS_URL)
+result_cache = OrderedDict()
+inflight_requests: Dict[str, asyncio.Future] = {}
 api_status = {
     "available": False,
     "quota_exceeded": False,
     "last_check": 0,
-    "consecutive_failures": 0
+    "consecutive_failures": 0,
+    # Cleared at startup if the key is missing or malformed; no live probes are made then
+    "key_valid": True
 }
+# Serializes status probes so concurrent requests share one round-trip
+api_status_lock = asyncio.Lock()
 
 # Initialize agents with error handling
 client = None
+process_pool = None
 pdf_processor = None
 summary_agent = None
 flashcard_agent = None
@@ -128,22 +365,49 @@ research_agent = None
 youtube_agent = None
 web_agent = None
 
-def check_api_status():
+def validate_api_key() -> bool:
+    """Check the Groq API key format locally, without an API round-trip"""
+    api_key = os.getenv("GROQ_API_KEY", "")
+    if not api_key:
+        logger.warning("⚠️ GROQ_API_KEY not found in environment variables")
+        logger.info("🔄 Running in fallback mode - basic functionality only")
+        return False
+    
+    if not api_key.startswith("gsk_"):
+        logger.warning("⚠️ GROQ_API_KEY doesn't look like a Groq key (expected 'gsk_' prefix)")
+        return False
+    
+    return True
+
+async def check_api_status(force: bool = False):
     """Check Groq API status and update global status"""
-    global api_status
-    
-    current_time = time.time()
+    if not api_status["key_valid"]:
+        return False
     
     # Only check every 60 seconds to avoid spam
-    if current_time - api_status["last_check"] < 60:
+    if not force and time.time() - api_status["last_check"] < 60:
         return api_status["available"]
     
+    async with api_status_lock:
+        # Another request may have refreshed the status while we waited
+        if not force and time.time() - api_status["last_check"] < 60:
+            return api_status["available"]
+        return await probe_api()
+
+async def probe_api() -> bool:
+    """Make a single test completion (no retries) and record the result in api_status"""
+    global api_status
+    
+    current_time = time.time()
+    
     try:
         if client:
-            test_response = client.chat_completion(
-                [{"role": "user", "content": "Test"}],
-                max_tokens=5
-            )
+            # The timeout only covers the API call; the probe never waits on the rate limiter
+            test_response = await asyncio.wait_for(client.aprobe(), timeout=API_PROBE_TIMEOUT)
+            
+            if test_response is None:
+                logger.info("⏳ Rate limit budget in use, keeping previous API status")
+                return api_status["available"]
             
             if "❌" in test_response:
                 if "quota" in test_response.lower() or "429" in test_response:
@@ -160,6 +424,10 @@ def check_api_status():
         else:
             api_status["available"] = False
             
+    except asyncio.TimeoutError:
+        api_status["available"] = False
+        api_status["consecutive_failures"] += 1
+        logger.error(f"API status check timed out after {API_PROBE_TIMEOUT:g}s")
     except Exception as e:
         api_status["available"] = False
         api_status["consecutive_failures"] += 1
@@ -173,6 +441,92 @@ def check_api_status():
     
     return api_status["available"]
 
+def truncate_text(text: str, max_chars: int) -> str:
+    return text[:max_chars] + "..." if len(text) > max_chars else text
+
+def make_cache_key(endpoint: str, text: str, *params) -> str:
+    """Build a result cache key from the endpoint, a hash of the text and request params"""
+    digest = hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+    return ":".join([endpoint, digest] + [str(param) for param in params])
+
+def cache_get(key: str):
+    """Return a cached result, or None if missing or expired"""
+    entry = result_cache.get(key)
+    if entry is None:
+        return None
+    
+    expires_at, value = entry
+    if expires_at < time.time():
+        del result_cache[key]
+        return None
+    
+    result_cache.move_to_end(key)
+    return value
+
+def cache_set(key: str, value, ttl: int = RESULT_CACHE_TTL):
+    """Store a result, evicting the least recently used entries past RESULT_CACHE_SIZE"""
+    result_cache[key] = (time.time() + ttl, value)
+    result_cache.move_to_end(key)
+    while len(result_cache) > RESULT_CACHE_SIZE:
+        result_cache.popitem(last=False)
+
+def sse_event(data: Dict, event: Optional[str] = None) -> str:
+    """Format a Server-Sent Event; data is JSON-encoded so newlines stay inside one event"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+async def single_flight(key: str, compute):
+    """Run compute() once per key; concurrent callers with the same key share its result"""
+    existing = inflight_requests.get(key)
+    if existing is not None:
+        logger.info(f"⏳ Joining in-flight request: {key}")
+        return await asyncio.shield(existing)
+    
+    future = asyncio.get_running_loop().create_future()
+    inflight_requests[key] = future
+    try:
+        result = await compute()
+        future.set_result(result)
+        return result
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        # Mark the exception as retrieved in case no other caller was waiting
+        future.exception()
+        raise
+    finally:
+        inflight_requests.pop(key, None)
+
+# Text-independent parts of the fallback content, shared read-only between requests
+_FALLBACK_STUDY_RECOMMENDATIONS: Final = """**Study Recommendations:**
+1. Read through the document systematically
+2. Take notes on key concepts and definitions
+3. Identify main themes and supporting arguments
+4. Create your own questions for self-testing
+
+*Note: This is a basic summary generated without AI assistance due to API limitations. For detailed analysis, please try again later when the AI service is available.*"""
+
+_FALLBACK_DOCUMENT_TYPE_QUESTION: Final = MappingProxyType({
+    'question': 'What type of document is this most likely to be?',
+    'options': (
+        'Academic or professional material',
+        'Fiction novel',
+        'Recipe collection',
+        'Shopping list'
+    ),
+    'correct_answer': 0,
+    'explanation': 'Based on the content structure and complexity, this appears to be academic or professional material.',
+    'difficulty': 'Basic'
+})
+
+_FALLBACK_STATEMENT_DISTRACTORS: Final = (
+    'This information is not mentioned in the document',
+    'The document states the opposite of this',
+    'This is only mentioned as a possibility'
+)
+
 def generate_fallback_summary(text: str) -> str:
     """Generate a basic summary without AI when quota is exceeded"""
     if not text.strip():
@@ -199,13 +553,7 @@ This document contains approximately {word_count} words across multiple sections
 - Estimated reading time: {word_count // 200} minutes
 - Content type: Academic/Professional material
 
-**Study Recommendations:**
-1. Read through the document systematically
-2. Take notes on key concepts and definitions
-3. Identify main themes and supporting arguments
-4. Create your own questions for self-testing
-
-*Note: This is a basic summary generated without AI assistance due to API limitations. For detailed analysis, please try again later when the AI service is available.*"""
+{_FALLBACK_STUDY_RECOMMENDATIONS}"""
 
     return summary
 
@@ -276,18 +624,7 @@ def generate_fallback_quiz(text: str, num_questions: int = 8) -> List[Dict]:
     })
     
     # Question 2: Content type
-    quiz_questions.append({
-        'question': 'What type of document is this most likely to be?',
-        'options': [
-            'Academic or professional material',
-            'Fiction novel',
-            'Recipe collection',
-            'Shopping list'
-        ],
-        'correct_answer': 0,
-        'explanation': 'Based on the content structure and complexity, this appears to be academic or professional material.',
-        'difficulty': 'Basic'
-    })
+    quiz_questions.append(dict(_FALLBACK_DOCUMENT_TYPE_QUESTION))
     
     # Generate questions from first few sentences
     for i, sentence in enumerate(sentences[:num_questions-2]):
@@ -296,9 +633,7 @@ def generate_fallback_quiz(text: str, num_questions: int = 8) -> List[Dict]:
                 'question': f'According to the document, which statement is true?',
                 'options': [
                     sentence[:60] + ('...' if len(sentence) > 60 else ''),
-                    'This information is not mentioned in the document',
-                    'The document states the opposite of this',
-                    'This is only mentioned as a possibility'
+                    *_FALLBACK_STATEMENT_DISTRACTORS
                 ],
                 'correct_answer': 0,
                 'explanation': f'The document states: {sentence}',
@@ -310,26 +645,87 @@ def generate_fallback_quiz(text: str, num_questions: int = 8) -> List[Dict]:
     
     return quiz_questions[:num_questions]
 
+def fallback_keywords(text: str) -> Tuple[str, List[str], List[str]]:
+    """Extract basic keywords without AI when quota is exceeded"""
+    words = text.split()[:200]  # First 200 words
+    topic = "Study Material"
+    research_keywords = [word for word in words if len(word) > 4 and word.istitle()][:5]
+    return topic, research_keywords, research_keywords
+
+async def get_session_or_404(session_id: str, *fields: str) -> Dict:
+    """Load a session (optionally only some fields) or raise 404"""
+    session = await study_sessions.get(session_id, *fields)
+    if session is None:
+        raise HTTPException(status_code=404, detail="No document found. Please upload a PDF first.")
+    return session
+
+async def get_session_keywords(session_id: str, session: Dict) -> Tuple[str, List[str], List[str]]:
+    """Return (topic, research_keywords, all_keywords) for a session.
+    
+    AI-extracted keywords are cached on the session so the discovery
+    endpoints share a single extraction round-trip.
+    """
+    if session.get("keywords"):
+        return tuple(session["keywords"])
+    
+    if research_agent:
+        # Keywords are extracted locally; the API is only used to label the topic
+        is_api_available = await check_api_status()
+        keywords = await asyncio.wait_for(
+            research_agent.aextract_keywords_and_topic(session["truncated"]["keywords"], label_topic=is_api_available),
+            timeout=45.0
+        )
+        if is_api_available:
+            await study_sessions.update(session_id, session["upload_id"], keywords=list(keywords))
+        return keywords
+    
+    return fallback_keywords(session["truncated"]["keywords"])
+
+async def run_discovery(label: str, func, *args, timeout: float) -> List[Dict]:
+    """Run a blocking discovery call in a thread, returning [] on timeout or error.
+    
+    `func` is None when its agent failed to initialize (fallback mode).
+    """
+    if func is None:
+        logger.warning(f"⚠️ {label} discovery unavailable - agent not initialized")
+        return []
+    
+    try:
+        return await asyncio.wait_for(asyncio.to_thread(func, *args), timeout=timeout)
+    except asyncio.TimeoutError:
+        logger.error(f"❌ {label} discovery timeout")
+        return []
+    except Exception as e:
+        logger.error(f"❌ {label} discovery error: {str(e)}")
+        return []
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize agents on startup with better error handling"""
-    global client, pdf_processor, summary_agent, flashcard_agent, quiz_agent, research_agent, youtube_agent, web_agent
+    global client, process_pool, pdf_processor, summary_agent, flashcard_agent, quiz_agent, research_agent, youtube_agent, web_agent
     
     try:
         logger.info("🚀 Initializing AI agents...")
         
-        # Check for Groq API key
-        if not os.getenv("GROQ_API_KEY"):
-            logger.warning("⚠️ GROQ_API_KEY not found in environment variables")
-            logger.info("🔄 Running in fallback mode - basic functionality only")
+        # Bound the executor behind asyncio.to_thread so it can be tuned per deployment
+        asyncio.get_running_loop().set_default_executor(
+            concurrent.futures.ThreadPoolExecutor(max_workers=THREAD_POOL_SIZE, thread_name_prefix="ai-study")
+        )
+        logger.info(f"✅ Thread pool initialized ({THREAD_POOL_SIZE} workers)")
+        
+        # Validate the Groq API key locally; the live check is deferred to the first request
+        if not validate_api_key():
+            api_status["key_valid"] = False
+            api_status["available"] = False
         
         # Initialize PDF processor (always available)
         pdf_processor = EnhancedPDFProcessor()
-        logger.info("✅ PDF processor initialized")
+        process_pool = create_process_pool()
+        logger.info(f"✅ PDF processor initialized ({PROCESS_POOL_SIZE} extraction processes)")
         
         # Try to initialize AI components
         try:
-            client = GroqClient()
+            client = GroqClient(rate_limiter=RateLimiter.from_env(workers=WORKERS))
             summary_agent = SummaryAgent(client)
             flashcard_agent = FlashcardAgent(client)
             quiz_agent = QuizAgent(client)
@@ -337,13 +733,7 @@ async def startup_event():
             youtube_agent = YouTubeDiscoveryAgent(client)
             web_agent = WebResourceAgent(client)
             
-            logger.info("✅ AI agents initialized")
-            
-            # Check API status
-            if check_api_status():
-                logger.info("✅ Groq API connection successful")
-            else:
-                logger.warning("⚠️ Groq API issues detected - fallback mode enabled")
+            logger.info("✅ AI agents initialized (API connection is checked on first use)")
                 
         except Exception as e:
             logger.error(f"❌ Error initializing AI agents: {e}")
@@ -353,6 +743,52 @@ async def startup_event():
         logger.error(f"❌ Critical error during startup: {e}")
         # Don't raise - allow server to start in fallback mode
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release worker processes on shutdown"""
+    if process_pool:
+        process_pool.shutdown(wait=False, cancel_futures=True)
+    if study_sessions.redis is not None:
+        await study_sessions.redis.aclose()
+
+def create_process_pool() -> concurrent.futures.ProcessPoolExecutor:
+    # Spawn rather than fork: forking a process that already runs executor and HTTP client threads can deadlock
+    return concurrent.futures.ProcessPoolExecutor(
+        max_workers=PROCESS_POOL_SIZE,
+        mp_context=multiprocessing.get_context("spawn")
+    )
+
+async def extract_pdf_parallel(file_path: str) -> Dict:
+    """Extract PDF pages concurrently across the process pool, reassembled in page order"""
+    global process_pool
+    
+    if process_pool is None:
+        return await asyncio.to_thread(pdf_processor.extract_text_fast, file_path, MAX_PDF_PAGES)
+    
+    try:
+        page_count = await asyncio.to_thread(pdf_processor.get_page_count, file_path)
+    except Exception as e:
+        return {"status": "error", "message": f"❌ Critical error processing PDF: {str(e)}"}
+    
+    loop = asyncio.get_running_loop()
+    # A worker may die mid-extraction (e.g. OOM-killed during OCR, or a MuPDF crash on a
+    # malformed file). Replace the pool and retry once; never redo the work in this process.
+    for attempt in range(2):
+        pool = process_pool
+        try:
+            pages = await asyncio.gather(*[
+                loop.run_in_executor(pool, extract_pdf_page, file_path, page_index, pdf_processor.tesseract_available)
+                for page_index in range(min(page_count, MAX_PDF_PAGES))
+            ])
+            return pdf_processor.assemble_page_results(page_count, pages)
+        except concurrent.futures.process.BrokenProcessPool:
+            logger.error(f"❌ PDF extraction process died (attempt {attempt + 1}), restarting process pool")
+            if process_pool is pool:
+                process_pool = create_process_pool()
+                pool.shutdown(wait=False, cancel_futures=True)
+    
+    return {"status": "error", "message": "❌ PDF extraction crashed. The file may be malformed or too large to process."}
+
 @app.get("/")
 async def root():
     return {"message": "AI Study Assistant API", "version": "1.0.0", "status": "running"}
@@ -360,7 +796,7 @@ async def root():
 @app.get("/api-status", response_model=ApiStatusResponse)
 async def get_api_status():
     """Get current API status"""
-    is_available = check_api_status()
+    is_available = await check_api_status()
     
     if api_status["quota_exceeded"]:
         status_msg = "Quota exceeded"
@@ -379,10 +815,10 @@ async def get_api_status():
         fallback_enabled=True
     )
 
-@app.get("/health")
+@app.get("/health", response_model=HealthResponse)
 async def health_check():
     """Enhanced health check"""
-    is_api_available = check_api_status()
+    is_api_available = await check_api_status()
     
     health_status = {
         "status": "healthy",
@@ -394,12 +830,27 @@ async def health_check():
         "groq_api_available": is_api_available,
         "groq_key_configured": bool(os.getenv("GROQ_API_KEY")),
         "fallback_mode": not is_api_available,
-        "active_sessions": len(study_sessions),
+        "active_sessions": await study_sessions.count(),
         "consecutive_api_failures": api_status["consecutive_failures"]
     }
     
     return health_status
 
+@app.get("/health/deep", response_model=DeepHealthResponse)
+async def deep_health_check():
+    """Health check that makes one real Groq API round-trip (no retries), for monitoring"""
+    start_time = time.time()
+    is_api_available = await check_api_status(force=True)
+    latency_ms = int((time.time() - start_time) * 1000)
+    
+    return DeepHealthResponse(
+        status="healthy" if is_api_available else "degraded",
+        groq_api_available=is_api_available,
+        quota_exceeded=api_status["quota_exceeded"],
+        latency_ms=latency_ms,
+        consecutive_api_failures=api_status["consecutive_failures"]
+    )
+
 @app.post("/upload-pdf", response_model=ProcessingStatus)
 async def upload_pdf(file: UploadFile = File(...)):
     """Upload and process PDF file - This works without AI"""
@@ -410,30 +861,29 @@ async def upload_pdf(file: UploadFile = File(...)):
     if not file.filename.lower().endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Only PDF files are allowed")
     
-    # Check file size (limit to 50MB)
-    content = await file.read()
-    file_size = len(content)
-    
-    if file_size > 50 * 1024 * 1024:  # 50MB limit
-        raise HTTPException(status_code=400, detail="File too large. Maximum size is 50MB")
-    
-    if file_size == 0:
-        raise HTTPException(status_code=400, detail="Empty file uploaded")
-    
     temp_file_path = None
     
     try:
-        logger.info(f"📄 Processing PDF: {file.filename} ({file_size/1024/1024:.2f}MB)")
-        
-        # Create temporary file
+        # Stream the upload to a temporary file in chunks, checking the size limit as we go.
+        # Disk writes run in a thread so slow storage doesn't block the event loop.
+        file_size = 0
         with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-            temp_file.write(content)
             temp_file_path = temp_file.name
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                file_size += len(chunk)
+                if file_size > MAX_UPLOAD_SIZE:
+                    raise HTTPException(status_code=400, detail="File too large. Maximum size is 50MB")
+                await asyncio.to_thread(temp_file.write, chunk)
+        
+        if file_size == 0:
+            raise HTTPException(status_code=400, detail="Empty file uploaded")
+        
+        logger.info(f"📄 Processing PDF: {file.filename} ({file_size/1024/1024:.2f}MB)")
         
-        # Process PDF with timeout handling
+        # Process PDF with timeout handling (PyMuPDF text layer first, OCR only for image pages)
         try:
             result = await asyncio.wait_for(
-                asyncio.to_thread(pdf_processor.extract_text_with_ocr, temp_file_path),
+                extract_pdf_parallel(temp_file_path),
                 timeout=120.0  # 2 minutes timeout
             )
         except asyncio.TimeoutError:
@@ -453,12 +903,19 @@ async def upload_pdf(file: UploadFile = File(...)):
         
         # Store session data
         session_id = "default"
-        study_sessions[session_id] = {
+        await study_sessions.set(session_id, {
+            # Identifies this upload so late writes for a replaced document are rejected
+            "upload_id": uuid.uuid4().hex,
             "text": result["text"],
             "file_info": f"File: {file.filename} ({file_size/1024/1024:.2f} MB)",
-            "processing_result": result,
-            "filename": file.filename
-        }
+            # The text is already stored above; don't keep a second copy
+            "processing_result": {key: value for key, value in result.items() if key != "text"},
+            "filename": file.filename,
+            "truncated": {
+                kind: truncate_text(result["text"], max_chars)
+                for kind, max_chars in TRUNCATION_LIMITS.items()
+            }
+        })
         
         logger.info(f"✅ PDF processed successfully: {result['word_count']} words extracted")
         
@@ -478,35 +935,43 @@ async def upload_pdf(file: UploadFile = File(...)):
     
     finally:
         # Clean up temp file
-        if temp_file_path and os.path.exists(temp_file_path):
+        if temp_file_path:
             try:
-                os.unlink(temp_file_path)
+                await asyncio.to_thread(os.unlink, temp_file_path)
+            except FileNotFoundError:
+                pass
             except Exception as e:
                 logger.warning(f"⚠️ Failed to cleanup temp file: {e}")
 
 @app.post("/generate-summary", response_model=SummaryResponse)
 async def generate_summary(session_id: str = "default"):
     """Generate summary with fallback support"""
+    session = await get_session_or_404(session_id, "text", "truncated")
     
-    if session_id not in study_sessions:
-        raise HTTPException(status_code=404, detail="No document found. Please upload a PDF first.")
-    
-    text = study_sessions[session_id]["text"]
-    is_api_available = check_api_status()
+    # Keyed on the document content, so requests after a new upload never join the old job
+    inflight_key = make_cache_key("summary", session["truncated"]["summary"])
+    return await single_flight(inflight_key, lambda: build_summary(session))
+
+async def build_summary(session: Dict) -> SummaryResponse:
+    text = session["text"]
+    is_api_available = await check_api_status()
     
     try:
         if is_api_available and summary_agent:
             logger.info("📝 Generating AI summary...")
             
             # Limit text length for faster processing
-            max_chars = 8000
-            if len(text) > max_chars:
-                text = text[:max_chars] + "..."
-                logger.info(f"📝 Text truncated to {max_chars} characters for faster processing")
+            text = session["truncated"]["summary"]
+            
+            cache_key = make_cache_key("summary", text)
+            cached = cache_get(cache_key)
+            if cached:
+                logger.info("✅ Returning cached summary")
+                return cached
             
             # Generate summary with timeout
             summary = await asyncio.wait_for(
-                asyncio.to_thread(summary_agent.generate_summary, text),
+                summary_agent.agenerate_summary(text),
                 timeout=90.0
             )
             
@@ -517,7 +982,9 @@ async def generate_summary(session_id: str = "default"):
                 return SummaryResponse(summary=summary, status="success", fallback_used=True)
             
             logger.info("✅ AI summary generated successfully")
-            return SummaryResponse(summary=summary, status="success", fallback_used=False)
+            response = SummaryResponse(summary=summary, status="success", fallback_used=False)
+            cache_set(cache_key, response)
+            return response
         
         else:
             # Use fallback mode
@@ -534,31 +1001,94 @@ async def generate_summary(session_id: str = "default"):
         summary = generate_fallback_summary(text)
         return SummaryResponse(summary=summary, status="success", fallback_used=True)
 
+@app.post("/generate-summary-stream")
+async def generate_summary_stream(session_id: str = "default"):
+    """Stream the summary as Server-Sent Events while it is generated.
+    
+    Emits `data: {"content": ...}` chunks followed by an `event: done` message.
+    /generate-summary remains available for clients that can't consume SSE.
+    """
+    
+    session = await get_session_or_404(session_id, "text", "truncated")
+    
+    text = session["text"]
+    is_api_available = await check_api_status()
+    
+    # Same truncation and cache key as /generate-summary so the two share results
+    ai_text = session["truncated"]["summary"]
+    cache_key = make_cache_key("summary", ai_text)
+    
+    async def event_stream():
+        cached = cache_get(cache_key)
+        if cached:
+            logger.info("✅ Returning cached summary")
+            yield sse_event({"content": cached.summary})
+            yield sse_event({"fallback_used": False}, event="done")
+            return
+        
+        if not (is_api_available and summary_agent):
+            logger.info("📝 Generating fallback summary (API unavailable)...")
+            yield sse_event({"content": generate_fallback_summary(text)})
+            yield sse_event({"fallback_used": True}, event="done")
+            return
+        
+        logger.info("📝 Streaming AI summary...")
+        chunks = []
+        try:
+            async for content in summary_agent.astream_summary(ai_text):
+                chunks.append(content)
+                yield sse_event({"content": content})
+        except Exception as e:
+            logger.error(f"❌ Summary streaming error: {str(e)}")
+            if chunks:
+                yield sse_event({"message": "Summary generation was interrupted"}, event="error")
+                return
+            yield sse_event({"content": generate_fallback_summary(text)})
+            yield sse_event({"fallback_used": True}, event="done")
+            return
+        
+        summary = "".join(chunks).strip()
+        cache_set(cache_key, SummaryResponse(summary=summary, status="success", fallback_used=False))
+        logger.info("✅ AI summary streamed successfully")
+        yield sse_event({"fallback_used": False}, event="done")
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
 @app.post("/generate-flashcards", response_model=FlashcardResponse)
 async def generate_flashcards(session_id: str = "default", num_cards: int = 10):
     """Generate flashcards with fallback support"""
-    
-    if session_id not in study_sessions:
-        raise HTTPException(status_code=404, detail="No document found. Please upload a PDF first.")
+    session = await get_session_or_404(session_id, "text", "truncated")
     
     if num_cards < 1 or num_cards > 20:
         num_cards = min(max(num_cards, 1), 20)
     
-    text = study_sessions[session_id]["text"]
-    is_api_available = check_api_status()
+    inflight_key = make_cache_key("flashcards", session["truncated"]["flashcards"], num_cards)
+    return await single_flight(inflight_key, lambda: build_flashcards(session, num_cards))
+
+async def build_flashcards(session: Dict, num_cards: int) -> FlashcardResponse:
+    text = session["text"]
+    is_api_available = await check_api_status()
     
     try:
         if is_api_available and flashcard_agent:
             logger.info(f"🃏 Generating {num_cards} AI flashcards...")
             
             # Limit text length for faster processing
-            max_chars = 6000
-            if len(text) > max_chars:
-                text = text[:max_chars] + "..."
+            text = session["truncated"]["flashcards"]
+            
+            cache_key = make_cache_key("flashcards", text, num_cards)
+            cached = cache_get(cache_key)
+            if cached:
+                logger.info("✅ Returning cached flashcards")
+                return cached
             
             # Generate flashcards with timeout
             flashcards = await asyncio.wait_for(
-                asyncio.to_thread(flashcard_agent.generate_flashcards_structured, text, num_cards),
+                flashcard_agent.agenerate_flashcards_structured(text, num_cards),
                 timeout=120.0
             )
             
@@ -569,7 +1099,9 @@ async def generate_flashcards(session_id: str = "default", num_cards: int = 10):
                 return FlashcardResponse(flashcards=flashcards, count=len(flashcards), status="success", fallback_used=True)
             
             logger.info(f"✅ Generated {len(flashcards)} AI flashcards successfully")
-            return FlashcardResponse(flashcards=flashcards, count=len(flashcards), status="success", fallback_used=False)
+            response = FlashcardResponse(flashcards=flashcards, count=len(flashcards), status="success", fallback_used=False)
+            cache_set(cache_key, response)
+            return response
         
         else:
             # Use fallback mode
@@ -586,31 +1118,101 @@ async def generate_flashcards(session_id: str = "default", num_cards: int = 10):
         flashcards = generate_fallback_flashcards(text, num_cards)
         return FlashcardResponse(flashcards=flashcards, count=len(flashcards), status="success", fallback_used=True)
 
+@app.post("/generate-flashcards-stream")
+async def generate_flashcards_stream(session_id: str = "default", num_cards: int = 10):
+    """Stream flashcards as newline-delimited JSON, one card per line, as they are generated.
+    
+    If generation fails after some cards were sent, the stream ends with an
+    `{"error": ...}` line instead of a card.
+    
+    /generate-flashcards remains available for clients that need the whole list at once.
+    """
+    
+    session = await get_session_or_404(session_id, "text", "truncated")
+    
+    if num_cards < 1 or num_cards > 20:
+        num_cards = min(max(num_cards, 1), 20)
+    
+    text = session["text"]
+    is_api_available = await check_api_status()
+    
+    # Same truncation and cache key as /generate-flashcards so the two share results
+    ai_text = session["truncated"]["flashcards"]
+    cache_key = make_cache_key("flashcards", ai_text, num_cards)
+    
+    async def card_stream():
+        cached = cache_get(cache_key)
+        if cached:
+            logger.info("✅ Returning cached flashcards")
+            for card in cached.flashcards:
+                yield card.model_dump_json() + "\n"
+            return
+        
+        if not (is_api_available and flashcard_agent):
+            logger.info(f"🃏 Generating {num_cards} fallback flashcards (API unavailable)...")
+            for card in generate_fallback_flashcards(text, num_cards):
+                yield json.dumps(card) + "\n"
+            return
+        
+        logger.info(f"🃏 Streaming {num_cards} AI flashcards...")
+        flashcards = []
+        try:
+            async for card in flashcard_agent.astream_flashcards(ai_text, num_cards):
+                flashcards.append(card)
+                yield json.dumps(card) + "\n"
+        except Exception as e:
+            logger.error(f"❌ Flashcard streaming error: {str(e)}")
+            if flashcards:
+                # Cards already sent can't be retracted; end with an error line and don't cache the partial set
+                yield json.dumps({"error": "Flashcard generation was interrupted"}) + "\n"
+                return
+        
+        if not flashcards:
+            logger.warning("AI flashcard streaming failed, using fallback")
+            for card in generate_fallback_flashcards(ai_text, num_cards):
+                yield json.dumps(card) + "\n"
+            return
+        
+        logger.info(f"✅ Streamed {len(flashcards)} AI flashcards successfully")
+        cache_set(cache_key, FlashcardResponse(flashcards=flashcards, count=len(flashcards), status="success", fallback_used=False))
+    
+    return StreamingResponse(
+        card_stream(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache"}
+    )
+
 @app.post("/generate-quiz", response_model=QuizResponse)
 async def generate_quiz(session_id: str = "default", num_questions: int = 8):
     """Generate quiz with fallback support"""
-    
-    if session_id not in study_sessions:
-        raise HTTPException(status_code=404, detail="No document found. Please upload a PDF first.")
+    session = await get_session_or_404(session_id, "text", "truncated")
     
     if num_questions < 1 or num_questions > 15:
         num_questions = min(max(num_questions, 1), 15)
     
-    text = study_sessions[session_id]["text"]
-    is_api_available = check_api_status()
+    inflight_key = make_cache_key("quiz", session["truncated"]["quiz"], num_questions)
+    return await single_flight(inflight_key, lambda: build_quiz(session, num_questions))
+
+async def build_quiz(session: Dict, num_questions: int) -> QuizResponse:
+    text = session["text"]
+    is_api_available = await check_api_status()
     
     try:
         if is_api_available and quiz_agent:
             logger.info(f"📝 Generating {num_questions} AI quiz questions...")
             
             # Limit text length for faster processing
-            max_chars = 6000
-            if len(text) > max_chars:
-                text = text[:max_chars] + "..."
+            text = session["truncated"]["quiz"]
+            
+            cache_key = make_cache_key("quiz", text, num_questions)
+            cached = cache_get(cache_key)
+            if cached:
+                logger.info("✅ Returning cached quiz")
+                return cached
             
             # Generate quiz with timeout
             quiz = await asyncio.wait_for(
-                asyncio.to_thread(quiz_agent.generate_quiz_structured, text, num_questions),
+                quiz_agent.agenerate_quiz_structured(text, num_questions),
                 timeout=120.0
             )
             
@@ -621,7 +1223,9 @@ async def generate_quiz(session_id: str = "default", num_questions: int = 8):
                 return QuizResponse(quiz=quiz, count=len(quiz), status="success", fallback_used=True)
             
             logger.info(f"✅ Generated {len(quiz)} AI quiz questions successfully")
-            return QuizResponse(quiz=quiz, count=len(quiz), status="success", fallback_used=False)
+            response = QuizResponse(quiz=quiz, count=len(quiz), status="success", fallback_used=False)
+            cache_set(cache_key, response)
+            return response
         
         else:
             # Use fallback mode
@@ -642,19 +1246,19 @@ async def generate_quiz(session_id: str = "default", num_questions: int = 8):
 async def discover_research(session_id: str = "default", max_papers: int = 10):
     """Discover research papers - works without AI quota"""
     
-    if session_id not in study_sessions:
-        raise HTTPException(status_code=404, detail="No document found. Please upload a PDF first.")
+    session = await get_session_or_404(session_id, "truncated", "keywords", "upload_id")
     
     if max_papers > 15:
         max_papers = 15
     
     try:
         logger.info("🔍 Discovering research papers...")
-        text = study_sessions[session_id]["text"]
+        text = session["truncated"]["keywords"]
+        keywords = await get_session_keywords(session_id, session)
         
         # This can work even with quota issues since it mainly uses web search
         papers = await asyncio.wait_for(
-            asyncio.to_thread(research_agent.find_papers, text, max_papers),
+            asyncio.to_thread(research_agent.find_papers, text, max_papers, keywords),
             timeout=180.0
         )
         
@@ -672,28 +1276,14 @@ async def discover_research(session_id: str = "default", max_papers: int = 10):
 async def discover_videos(session_id: str = "default", max_videos: int = 10):
     """Discover YouTube videos - works without AI quota"""
     
-    if session_id not in study_sessions:
-        raise HTTPException(status_code=404, detail="No document found. Please upload a PDF first.")
+    session = await get_session_or_404(session_id, "truncated", "keywords", "upload_id")
     
     if max_videos > 12:
         max_videos = 12
     
     try:
         logger.info("🎥 Discovering educational videos...")
-        text = study_sessions[session_id]["text"]
-        
-        # Extract keywords with fallback
-        if check_api_status() and research_agent:
-            topic, research_keywords, all_keywords = await asyncio.wait_for(
-                asyncio.to_thread(research_agent.extract_smart_keywords_and_topic, text),
-                timeout=45.0
-            )
-        else:
-            # Fallback keyword extraction
-            words = text.split()[:200]  # First 200 words
-            topic = "Study Material"
-            research_keywords = [word for word in words if len(word) > 4 and word.istitle()][:5]
-            all_keywords = research_keywords
+        topic, research_keywords, all_keywords = await get_session_keywords(session_id, session)
         
         # Find videos
         videos = await asyncio.wait_for(
@@ -715,28 +1305,14 @@ async def discover_videos(session_id: str = "default", max_videos: int = 10):
 async def discover_resources(session_id: str = "default", max_resources: int = 12):
     """Discover web resources - works without AI quota"""
     
-    if session_id not in study_sessions:
-        raise HTTPException(status_code=404, detail="No document found. Please upload a PDF first.")
+    session = await get_session_or_404(session_id, "truncated", "keywords", "upload_id")
     
     if max_resources > 15:
         max_resources = 15
     
     try:
         logger.info("🌐 Discovering web resources...")
-        text = study_sessions[session_id]["text"]
-        
-        # Extract keywords with fallback
-        if check_api_status() and research_agent:
-            topic, research_keywords, all_keywords = await asyncio.wait_for(
-                asyncio.to_thread(research_agent.extract_smart_keywords_and_topic, text),
-                timeout=45.0
-            )
-        else:
-            # Fallback keyword extraction
-            words = text.split()[:200]  # First 200 words
-            topic = "Study Material"
-            research_keywords = [word for word in words if len(word) > 4 and word.istitle()][:5]
-            all_keywords = research_keywords
+        topic, research_keywords, all_keywords = await get_session_keywords(session_id, session)
         
         # Find resources
         resources = await asyncio.wait_for(
@@ -754,6 +1330,42 @@ async def discover_resources(session_id: str = "default", max_resources: int = 1
         logger.error(f"❌ Resource discovery error: {str(e)}")
         return WebResourcesResponse(resources=[], count=0, status="success")
 
+@app.post("/discover-all", response_model=DiscoveryResponse)
+async def discover_all(session_id: str = "default", max_papers: int = 10, max_videos: int = 10, max_resources: int = 12):
+    """Discover research papers, videos and web resources concurrently"""
+    
+    session = await get_session_or_404(session_id, "truncated", "keywords", "upload_id")
+    
+    max_papers = min(max_papers, 15)
+    max_videos = min(max_videos, 12)
+    max_resources = min(max_resources, 15)
+    
+    logger.info("🔍 Discovering papers, videos and web resources...")
+    text = session["truncated"]["keywords"]
+    
+    try:
+        keywords = await get_session_keywords(session_id, session)
+    except asyncio.TimeoutError:
+        logger.error("❌ Keyword extraction timeout, using basic keywords")
+        keywords = fallback_keywords(text)
+    except Exception as e:
+        logger.error(f"❌ Keyword extraction error: {str(e)}, using basic keywords")
+        keywords = fallback_keywords(text)
+    topic, research_keywords, all_keywords = keywords
+    
+    # Each source has its own timeout so one slow search doesn't hold up the others
+    papers, videos, resources = await asyncio.gather(
+        run_discovery("Research", research_agent.find_papers if research_agent else None,
+                      text, max_papers, keywords, timeout=180.0),
+        run_discovery("Video", youtube_agent.find_videos if youtube_agent else None,
+                      research_keywords, topic, max_videos, timeout=150.0),
+        run_discovery("Resource", web_agent.find_resources if web_agent else None,
+                      research_keywords, topic, max_resources, timeout=150.0)
+    )
+    
+    logger.info(f"✅ Found {len(papers)} papers, {len(videos)} videos, {len(resources)} web resources")
+    return DiscoveryResponse(papers=papers, videos=videos, resources=resources, status="success")
+
 @app.post("/ask-question", response_model=AnswerResponse)
 async def ask_question(request: QuestionRequest):
     """Answer questions with fallback support"""
@@ -764,7 +1376,7 @@ async def ask_question(request: QuestionRequest):
     if not request.document_text.strip():
         raise HTTPException(status_code=400, detail="No document text provided")
     
-    is_api_available = check_api_status()
+    is_api_available = await check_api_status()
     
     try:
         if is_api_available and client:
@@ -791,7 +1403,7 @@ Instructions:
 
             # Generate answer with timeout
             response = await asyncio.wait_for(
-                asyncio.to_thread(client.chat_completion, [{"role": "user", "content": prompt}], None, 800),
+                client.achat_completion([{"role": "user", "content": prompt}], max_tokens=800),
                 timeout=60.0
             )
             
@@ -877,26 +1489,25 @@ def generate_fallback_answer(question: str, document_text: str) -> str:
 
 **Note:** This search was performed using basic text matching due to AI service limitations. For more sophisticated analysis, please try again later when the AI service is available."""
 
-@app.delete("/clear-session")
+@app.delete("/clear-session", response_model=ClearSessionResponse)
 async def clear_session(session_id: str = "default"):
     """Clear session data"""
     
-    if session_id in study_sessions:
-        del study_sessions[session_id]
+    if await study_sessions.delete(session_id):
         logger.info(f"🗑️ Cleared session: {session_id}")
         return {"message": "Session cleared successfully", "status": "success"}
     else:
         return {"message": "No active session found", "status": "info"}
 
-@app.get("/session-info")
+@app.get("/session-info", response_model=SessionInfoResponse, response_model_exclude_none=True)
 async def get_session_info(session_id: str = "default"):
     """Get information about current session"""
     
-    if session_id not in study_sessions:
+    session_data = await study_sessions.get(session_id, "file_info", "filename", "processing_result")
+    if session_data is None:
         return {"active": False, "message": "No active session"}
     
-    session_data = study_sessions[session_id]
-    is_api_available = check_api_status()
+    is_api_available = await check_api_status()
     
     return {
         "active": True,
@@ -912,10 +1523,10 @@ async def get_session_info(session_id: str = "default"):
         }
     }
 
-@app.post("/check-quota")
+@app.post("/check-quota", response_model=QuotaCheckResponse)
 async def check_quota_endpoint():
     """Endpoint to manually check API quota status"""
-    is_available = check_api_status()
+    is_available = await check_api_status()
     
     return {
         "api_available": is_available,
@@ -942,10 +1553,24 @@ if __name__ == "__main__":
     print("🔍 Interactive API: http://localhost:8000/redoc")
     print("💡 Features work with or without Groq API quota!")
     
+    if WORKERS > 1 and not REDIS_URL:
+        print("⚠️ WORKERS > 1 without REDIS_URL: sessions won't be shared between workers")
+    
+    # THREAD_POOL_SIZE applies per uvicorn worker process: each worker builds its
+    # own pool on startup, so total blocking threads = workers * THREAD_POOL_SIZE.
+    # PDF extraction processes re-import this script when started this way; launching
+    # with `uvicorn fastapi_backend:app` keeps them down to pdf_extraction's imports.
+    print(f"🧵 Workers: {WORKERS}, thread pool size per worker: {THREAD_POOL_SIZE}, "
+          f"PDF processes per worker: {PROCESS_POOL_SIZE}")
+    
     uvicorn.run(
         "fastapi_backend:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
+        reload=RELOAD,
+        workers=None if RELOAD else WORKERS,
+        # uvloop is not available on Windows
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
         log_level="info"
     )
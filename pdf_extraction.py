@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Per-page PDF extraction.
+
+Kept separate from pipeline so PDF worker processes only import PyMuPDF and
+Tesseract, not the Groq client and discovery agents.
+"""
+
+from typing import Dict
+
+import pymupdf
+import pytesseract
+from PIL import Image
+
+def extract_page_text(page, use_ocr: bool = True) -> Dict[str, str]:
+    """Extract text from an open PyMuPDF page, using OCR only if it has no text layer"""
+    page_result = {"text": "", "method": "", "error": ""}
+    try:
+        page_text = page.get_text("text").strip()
+        if len(page_text) >= 20:
+            page_result.update(text=page_text, method="text_extraction")
+        elif use_ocr:
+            pixmap = page.get_pixmap(dpi=200)
+            image = Image.frombytes("RGB", (pixmap.width, pixmap.height), pixmap.samples)
+            ocr_text = pytesseract.image_to_string(image, lang='eng', config='--psm 6').strip()
+            if ocr_text:
+                page_result.update(text=ocr_text, method="ocr")
+    except Exception as e:
+        page_result["error"] = f"Page {page.number + 1}: {str(e)}"
+    return page_result
+
+def extract_pdf_page(file_path: str, page_index: int, use_ocr: bool = True) -> Dict[str, str]:
+    """Extract a single page by index.
+    
+    Kept at module level so it can run in a ProcessPoolExecutor. The PDF is
+    reopened in the worker because PyMuPDF handles can't be shared across processes.
+    """
+    try:
+        with pymupdf.open(file_path) as pdf:
+            return extract_page_text(pdf[page_index], use_ocr)
+    except Exception as e:
+        return {"text": "", "method": "", "error": f"Page {page_index + 1}: {str(e)}"}
@@ -6,70 +6,242 @@ import subprocess
 import tempfile
 import shutil
 from datetime import datetime
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 import time
 import json
+import asyncio
+import random
+import threading
 import re
 import requests
 from urllib.parse import quote_plus, urljoin
 from bs4 import BeautifulSoup
 import xml.etree.ElementTree as ET
 from collections import Counter
+from contextlib import asynccontextmanager, contextmanager, nullcontext
 from urllib.parse import urlparse
 
+import pymupdf
+import yake
 import pdfplumber
 import pytesseract
 from pdf2image import convert_from_path
 from PIL import Image, ImageDraw, ImageFont
 from dotenv import load_dotenv
-from groq import Groq
+from groq import Groq, AsyncGroq
+
+from pdf_extraction import extract_page_text, extract_pdf_page
 
 # Load environment variables
 load_dotenv()
 
+##### RATE LIMITING #####
+class RateLimiter:
+    """Token bucket for requests-per-minute and tokens-per-minute budgets.
+    
+    Capacity refills continuously from elapsed time, so a call is admitted
+    as soon as the budget allows instead of failing against the API's limits.
+    """
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.max_requests_per_minute = requests_per_minute
+        self.max_tokens_per_minute = tokens_per_minute
+        self.available_req_capacity = float(requests_per_minute)
+        self.available_token_capacity = float(tokens_per_minute)
+        self.last_update = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, workers: int = 1) -> "RateLimiter":
+        """Build a limiter from GROQ_RPM / GROQ_TPM.
+        
+        The limits apply to the whole API key, so when several processes share
+        the key each one gets an equal 1/`workers` share of the budget.
+        """
+        workers = max(workers, 1)
+        return cls(
+            requests_per_minute=max(int(os.getenv("GROQ_RPM", "30")) // workers, 1),
+            tokens_per_minute=max(int(os.getenv("GROQ_TPM", "30000")) // workers, 1)
+        )
+
+    def _try_consume(self, tokens: int) -> float:
+        """Consume capacity if available, otherwise return how many seconds to wait"""
+        # A single request larger than the whole budget must still be admissible
+        tokens = min(tokens, self.max_tokens_per_minute)
+        
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self.last_update
+            self.last_update = now
+            self.available_req_capacity = min(
+                self.max_requests_per_minute,
+                self.available_req_capacity + elapsed * self.max_requests_per_minute / 60
+            )
+            self.available_token_capacity = min(
+                self.max_tokens_per_minute,
+                self.available_token_capacity + elapsed * self.max_tokens_per_minute / 60
+            )
+            
+            if self.available_req_capacity >= 1 and self.available_token_capacity >= tokens:
+                self.available_req_capacity -= 1
+                self.available_token_capacity -= tokens
+                return 0.0
+            
+            req_wait = max(0.0, 1 - self.available_req_capacity) * 60 / self.max_requests_per_minute
+            token_wait = max(0.0, tokens - self.available_token_capacity) * 60 / self.max_tokens_per_minute
+            return max(req_wait, token_wait)
+
+    def try_acquire(self, tokens: int) -> bool:
+        """Consume capacity only if it is available right now, without waiting"""
+        return self._try_consume(tokens) == 0
+
+    @asynccontextmanager
+    async def acquire(self, tokens: int):
+        while (wait_time := self._try_consume(tokens)) > 0:
+            await asyncio.sleep(wait_time)
+        yield
+
+    @contextmanager
+    def acquire_blocking(self, tokens: int):
+        while (wait_time := self._try_consume(tokens)) > 0:
+            time.sleep(wait_time)
+        yield
+
 ##### GROQ CLIENT WITH IMPROVED ERROR HANDLING #####
 class GroqClient:
-    def __init__(self):
+    def __init__(self, rate_limiter: RateLimiter = None):
         api_key = os.getenv("GROQ_API_KEY")
         if not api_key:
             raise ValueError("❌ Groq API key not found. Please set GROQ_API_KEY in your .env file")
         
         self.client = Groq(api_key=api_key)
+        self.async_client = AsyncGroq(api_key=api_key)
+        self.rate_limiter = rate_limiter or RateLimiter.from_env()
         self.model_fallbacks = [
             "mixtral-8x7b-32768",  # Primary model
             "llama3-8b-8192",      # New fallback option
             "llama3-70b-8192"      # Larger model option
         ]
 
-    def chat_completion(self, messages: List[Dict], model: str = None, max_tokens: int = None, retry_count: int = 3) -> str:
+    def _models_to_try(self, model: str = None) -> List[str]:
         if model is None:
-            models_to_try = self.model_fallbacks
-        else:
-            models_to_try = [model] + [m for m in self.model_fallbacks if m != model]
+            return self.model_fallbacks
+        return [model] + [m for m in self.model_fallbacks if m != model]
+
+    def _estimate_tokens(self, messages: List[Dict], max_tokens: int = None) -> int:
+        # Rough prompt estimate (~4 chars per token) plus the completion budget
+        prompt_tokens = sum(len(message.get("content", "")) for message in messages) // 4
+        return prompt_tokens + (max_tokens or 1000)
+
+    def _backoff_time(self, attempt: int) -> float:
+        # Exponential backoff with jitter so concurrent retries don't arrive together
+        return 2 ** (attempt + 1) + random.uniform(0, 1)
+
+    def chat_completion(self, messages: List[Dict], model: str = None, max_tokens: int = None, retry_count: int = 3) -> str:
+        models_to_try = self._models_to_try(model)
+        estimated_tokens = self._estimate_tokens(messages, max_tokens)
         
         for attempt in range(retry_count):
             for model_name in models_to_try:
                 try:
                     print(f"🤖 Using model: {model_name} (attempt {attempt + 1})")
-                    response = self.client.chat.completions.create(
-                        model=model_name,
-                        messages=messages,
-                        max_tokens=max_tokens,
-                        temperature=0.7
-                    )
+                    with self.rate_limiter.acquire_blocking(estimated_tokens):
+                        response = self.client.chat.completions.create(
+                            model=model_name,
+                            messages=messages,
+                            max_tokens=max_tokens,
+                            temperature=0.7
+                        )
                     return response.choices[0].message.content.strip()
                 
                 except Exception as e:
                     print(f"⏱️ Error with {model_name}: {str(e)}")
-                    if attempt < retry_count - 1:
-                        wait_time = (attempt + 1) * 2
-                        print(f"⏳ Waiting {wait_time} seconds before retry...")
-                        time.sleep(wait_time)
                     continue
+            
+            if attempt < retry_count - 1:
+                wait_time = self._backoff_time(attempt)
+                print(f"⏳ Waiting {wait_time:.1f} seconds before retry...")
+                time.sleep(wait_time)
         
         return "❌ All AI models failed. Please check your Groq API key and internet connection."
 
+    async def achat_completion(self, messages: List[Dict], model: str = None, max_tokens: int = None, retry_count: int = 3, rate_limited: bool = True) -> str:
+        """Async variant of chat_completion that awaits the Groq API without holding a thread.
+        
+        rate_limited=False skips waiting on the rate limiter, for callers that
+        already reserved capacity themselves.
+        """
+        models_to_try = self._models_to_try(model)
+        estimated_tokens = self._estimate_tokens(messages, max_tokens)
+        
+        for attempt in range(retry_count):
+            for model_name in models_to_try:
+                try:
+                    print(f"🤖 Using model: {model_name} (attempt {attempt + 1})")
+                    limiter = self.rate_limiter.acquire(estimated_tokens) if rate_limited else nullcontext()
+                    async with limiter:
+                        response = await self.async_client.chat.completions.create(
+                            model=model_name,
+                            messages=messages,
+                            max_tokens=max_tokens,
+                            temperature=0.7
+                        )
+                    return response.choices[0].message.content.strip()
+                
+                except Exception as e:
+                    print(f"⏱️ Error with {model_name}: {str(e)}")
+                    continue
+            
+            if attempt < retry_count - 1:
+                wait_time = self._backoff_time(attempt)
+                print(f"⏳ Waiting {wait_time:.1f} seconds before retry...")
+                await asyncio.sleep(wait_time)
+        
+        return "❌ All AI models failed. Please check your Groq API key and internet connection."
+
+    async def aprobe(self) -> Optional[str]:
+        """Make one test completion (no retries) for health checks.
+        
+        Returns None without calling the API when the rate limit budget is
+        exhausted right now, so local throttling is never reported as an outage.
+        """
+        messages = [{"role": "user", "content": "Test"}]
+        if not self.rate_limiter.try_acquire(self._estimate_tokens(messages, 5)):
+            return None
+        return await self.achat_completion(messages, max_tokens=5, retry_count=1, rate_limited=False)
+
+    async def astream_chat_completion(self, messages: List[Dict], model: str = None, max_tokens: int = None):
+        """Yield content deltas as the model generates them.
+        
+        Falls back to the next model only if the stream can't be opened;
+        errors after the first token are raised to the caller.
+        """
+        estimated_tokens = self._estimate_tokens(messages, max_tokens)
+        last_error = None
+        
+        for model_name in self._models_to_try(model):
+            try:
+                print(f"🤖 Streaming with model: {model_name}")
+                async with self.rate_limiter.acquire(estimated_tokens):
+                    stream = await self.async_client.chat.completions.create(
+                        model=model_name,
+                        messages=messages,
+                        max_tokens=max_tokens,
+                        temperature=0.7,
+                        stream=True
+                    )
+            except Exception as e:
+                print(f"⏱️ Error with {model_name}: {str(e)}")
+                last_error = e
+                continue
+            
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+            return
+        
+        raise RuntimeError(f"All AI models failed: {last_error}")
+
 ##### ENHANCED PDF PROCESSOR WITH BETTER ERROR HANDLING #####
 class EnhancedPDFProcessor:
     def __init__(self):
@@ -154,24 +326,7 @@ class EnhancedPDFProcessor:
                     result["error_details"].append("OCR not available (Tesseract not installed)")
 
             # Combine results
-            final_text = text_content + ocr_content
-            result["text"] = final_text.strip()
-            result["word_count"] = len(final_text.split())
-
-            # Set final status and message
-            if result["word_count"] > 50:
-                methods = " + ".join(result["methods_used"])
-                result["message"] = f"✅ Successfully extracted {result['word_count']} words using: {methods}"
-                result["status"] = "success"
-            elif result["word_count"] > 0:
-                result["status"] = "warning"
-                result["message"] = f"⚠️ Limited content extracted ({result['word_count']} words). PDF may be image-based or have formatting issues."
-            else:
-                result["status"] = "error"
-                result["message"] = "❌ No text could be extracted. PDF might be image-based, protected, or corrupted."
-
-            print(f"📊 Final result: {result['status']} - {result['word_count']} words")
-            return result
+            return self._finalize_result(result, text_content + ocr_content)
 
         except Exception as e:
             result["status"] = "error"
@@ -179,6 +334,99 @@ class EnhancedPDFProcessor:
             result["error_details"].append(str(e))
             return result
 
+    def get_page_count(self, file_path: str) -> int:
+        with pymupdf.open(file_path) as pdf:
+            return pdf.page_count
+
+    def extract_text_fast(self, file_path: str, max_pages: int = 20) -> Dict[str, any]:
+        """Extract text with PyMuPDF, running OCR only on pages without a text layer"""
+        if not os.path.exists(file_path):
+            return self._error_result(f"File not found: {file_path}")
+
+        try:
+            print(f"📄 Processing PDF: {file_path}")
+            with pymupdf.open(file_path) as pdf:
+                page_count = pdf.page_count
+                pages_to_process = min(page_count, max_pages)
+                print(f"📊 PDF has {page_count} pages, processing {pages_to_process}")
+                pages = [
+                    extract_page_text(pdf[page_num], self.tesseract_available)
+                    for page_num in range(pages_to_process)
+                ]
+            return self.assemble_page_results(page_count, pages)
+
+        except Exception as e:
+            return self._error_result(f"❌ Critical error processing PDF: {str(e)}")
+
+    def assemble_page_results(self, page_count: int, pages: List[Dict[str, str]]) -> Dict[str, any]:
+        """Combine per-page extraction results (in page order) into a single result"""
+        result = self._empty_result()
+        result["page_count"] = page_count
+        text_content = ""
+        missing_pages = 0
+
+        for page_num, page in enumerate(pages, 1):
+            if page["error"]:
+                result["error_details"].append(page["error"])
+            if page["method"] == "text_extraction":
+                text_content += f"\n--- Page {page_num} ---\n{page['text']}\n"
+                result["extracted_pages"] += 1
+            elif page["method"] == "ocr":
+                text_content += f"\n--- Page {page_num} (OCR) ---\n{page['text']}\n"
+                result["ocr_pages"] += 1
+            else:
+                missing_pages += 1
+
+        if missing_pages and not self.tesseract_available:
+            result["error_details"].append("OCR not available (Tesseract not installed)")
+        if result["extracted_pages"] > 0:
+            result["methods_used"].append("text_extraction")
+        if result["ocr_pages"] > 0:
+            result["methods_used"].append("ocr")
+        print(f"✅ Text layer: {result['extracted_pages']} pages, OCR: {result['ocr_pages']} pages")
+
+        return self._finalize_result(result, text_content)
+
+    def _empty_result(self) -> Dict[str, any]:
+        return {
+            "text": "",
+            "page_count": 0,
+            "extracted_pages": 0,
+            "ocr_pages": 0,
+            "word_count": 0,
+            "status": "success",
+            "methods_used": [],
+            "message": "",
+            "error_details": []
+        }
+
+    def _error_result(self, message: str) -> Dict[str, any]:
+        result = self._empty_result()
+        result["status"] = "error"
+        result["message"] = message
+        result["error_details"].append(message)
+        return result
+
+    def _finalize_result(self, result: Dict[str, any], final_text: str) -> Dict[str, any]:
+        """Fill in text, word count, status and message on an extraction result"""
+        result["text"] = final_text.strip()
+        result["word_count"] = len(final_text.split())
+
+        # Set final status and message
+        if result["word_count"] > 50:
+            methods = " + ".join(result["methods_used"])
+            result["message"] = f"✅ Successfully extracted {result['word_count']} words using: {methods}"
+            result["status"] = "success"
+        elif result["word_count"] > 0:
+            result["status"] = "warning"
+            result["message"] = f"⚠️ Limited content extracted ({result['word_count']} words). PDF may be image-based or have formatting issues."
+        else:
+            result["status"] = "error"
+            result["message"] = "❌ No text could be extracted. PDF might be image-based, protected, or corrupted."
+
+        print(f"📊 Final result: {result['status']} - {result['word_count']} words")
+        return result
+
     def _extract_with_ocr(self, file_path: str, max_pages: int = 5) -> str:
         if not self.tesseract_available:
             return ""
@@ -226,18 +474,57 @@ class SummaryAgent:
         self.client = client
 
     def generate_summary(self, text: str) -> str:
+        error = self._check_content(text)
+        if error:
+            return error
+        
+        try:
+            response = self.client.chat_completion([{"role": "user", "content": self._build_prompt(text)}], max_tokens=1500)
+            if response.startswith("❌"):
+                return f"❌ Summary generation failed: {response}"
+            return response
+        except Exception as e:
+            return f"❌ Summary generation failed: {str(e)}"
+
+    async def agenerate_summary(self, text: str) -> str:
+        """Async variant of generate_summary"""
+        error = self._check_content(text)
+        if error:
+            return error
+        
+        try:
+            response = await self.client.achat_completion([{"role": "user", "content": self._build_prompt(text)}], max_tokens=1500)
+            if response.startswith("❌"):
+                return f"❌ Summary generation failed: {response}"
+            return response
+        except Exception as e:
+            return f"❌ Summary generation failed: {str(e)}"
+
+    async def astream_summary(self, text: str):
+        """Yield the summary in chunks as the model generates it"""
+        error = self._check_content(text)
+        if error:
+            raise ValueError(error)
+        
+        async for content in self.client.astream_chat_completion([{"role": "user", "content": self._build_prompt(text)}], max_tokens=1500):
+            yield content
+
+    def _check_content(self, text: str) -> str:
         if not text.strip():
             return "❌ No content available to summarize."
         
         if len(text.split()) < 10:
             return "⚠️ Content too short for meaningful summary."
         
+        return ""
+
+    def _build_prompt(self, text: str) -> str:
         # Truncate text if too long
         max_chars = 8000
         if len(text) > max_chars:
             text = text[:max_chars] + "..."
         
-        prompt = f"""Create a comprehensive, well-structured summary of the following academic content.
+        return f"""Create a comprehensive, well-structured summary of the following academic content.
 
 Document Content:
 {text}
@@ -265,14 +552,6 @@ List 4-6 essential points that students must remember
 Highlight areas that deserve extra attention
 
 Make the summary engaging, clear, and educational."""
-        
-        try:
-            response = self.client.chat_completion([{"role": "user", "content": prompt}], max_tokens=1500)
-            if response.startswith("❌"):
-                return f"❌ Summary generation failed: {response}"
-            return response
-        except Exception as e:
-            return f"❌ Summary generation failed: {str(e)}"
 
 class FlashcardAgent:
     def __init__(self, client: GroqClient):
@@ -280,18 +559,89 @@ class FlashcardAgent:
 
     def generate_flashcards_structured(self, text: str, num_cards=10) -> List[Dict]:
         """Generate structured flashcards data for the app interface"""
-        if not text.strip():
+        text = self._prepare_text(text)
+        if text is None:
             return []
         
-        if len(text.split()) < 20:
+        try:
+            response = self.client.chat_completion(
+                [{"role": "user", "content": self._build_prompt(text, num_cards)}],
+                max_tokens=self._max_tokens(num_cards)
+            )
+            return self._parse_flashcards(response) or self._generate_basic_flashcards(text, num_cards)
+        
+        except Exception as e:
+            print(f"❌ Flashcard generation error: {e}")
+            return self._generate_basic_flashcards(text, num_cards)
+
+    async def agenerate_flashcards_structured(self, text: str, num_cards=10) -> List[Dict]:
+        """Async variant of generate_flashcards_structured.
+        
+        Returns [] instead of basic flashcards when generation fails, so callers
+        can tell AI output from fallback content.
+        """
+        text = self._prepare_text(text)
+        if text is None:
+            return []
+        
+        try:
+            response = await self.client.achat_completion(
+                [{"role": "user", "content": self._build_prompt(text, num_cards)}],
+                max_tokens=self._max_tokens(num_cards)
+            )
+            return self._parse_flashcards(response)
+        
+        except Exception as e:
+            print(f"❌ Flashcard generation error: {e}")
             return []
+
+    async def astream_flashcards(self, text: str, num_cards=10):
+        """Yield validated flashcards one at a time as the model emits JSON lines"""
+        text = self._prepare_text(text)
+        if text is None:
+            return
+        
+        buffer = ""
+        count = 0
+        async for content in self.client.astream_chat_completion(
+            [{"role": "user", "content": self._build_stream_prompt(text, num_cards)}],
+            max_tokens=self._max_tokens(num_cards)
+        ):
+            buffer += content
+            while "\n" in buffer and count < num_cards:
+                line, buffer = buffer.split("\n", 1)
+                card = self._parse_card_line(line)
+                if card:
+                    count += 1
+                    yield card
+            if count >= num_cards:
+                return
+        
+        # The last line may arrive without a trailing newline
+        card = self._parse_card_line(buffer)
+        if card:
+            yield card
+
+    def _prepare_text(self, text: str) -> str:
+        """Return the text truncated for the prompt, or None if there is too little content"""
+        if not text.strip():
+            return None
+        
+        if len(text.split()) < 20:
+            return None
         
         # Truncate text if too long
         max_chars = 7000
         if len(text) > max_chars:
             text = text[:max_chars] + "..."
-        
-        prompt = f"""Create {num_cards} high-quality study flashcards based on the following content. Return ONLY a valid JSON array with no additional text.
+        return text
+
+    def _max_tokens(self, num_cards: int) -> int:
+        # All cards come back in one JSON array, so budget tokens per card to avoid truncated JSON
+        return min(250 * num_cards + 200, 6000)
+
+    def _build_prompt(self, text: str, num_cards: int) -> str:
+        return f"""Create exactly {num_cards} high-quality study flashcards based on the following content. Return ONLY a valid JSON array with no additional text.
 
 Content:
 {text}
@@ -320,49 +670,83 @@ Guidelines:
 - Include relevant examples in answers
 - Mix difficulty levels: Basic, Intermediate, Advanced
 - Keep questions clear and answers comprehensive"""
+
+    def _build_stream_prompt(self, text: str, num_cards: int) -> str:
+        return f"""Create exactly {num_cards} high-quality study flashcards based on the following content. Return them as JSON Lines: one complete JSON object per line, with no array brackets, no markdown and no additional text.
+
+Content:
+{text}
+
+Return format (one flashcard per line):
+{{"question": "Clear, specific question", "answer": "Comprehensive answer with examples", "difficulty": "Basic", "category": "Main topic category", "hint": "Optional memory aid or hint"}}
+{{"question": "Another clear question", "answer": "Another comprehensive answer", "difficulty": "Intermediate", "category": "Topic category", "hint": "Memory aid"}}
+
+Guidelines:
+- Create diverse question types (definitions, applications, comparisons)
+- Test understanding, not just memorization
+- Include relevant examples in answers
+- Mix difficulty levels: Basic, Intermediate, Advanced
+- Never put a line break inside a flashcard"""
+
+    def _validate_card(self, card) -> Optional[Dict]:
+        """Return the card with all required fields, or None if it is malformed"""
+        if not (isinstance(card, dict) and 'question' in card and 'answer' in card):
+            return None
+        
+        return {
+            'question': str(card.get('question', '')),
+            'answer': str(card.get('answer', '')),
+            'difficulty': str(card.get('difficulty') or 'Basic'),
+            'category': str(card.get('category') or 'General'),
+            'hint': str(card.get('hint') or '')
+        }
+
+    def _parse_card_line(self, line: str) -> Optional[Dict]:
+        """Parse one JSON Lines flashcard, ignoring blank lines and stray markdown"""
+        line = line.strip().rstrip(',')
+        if not line.startswith('{'):
+            return None
         
         try:
-            response = self.client.chat_completion([{"role": "user", "content": prompt}], max_tokens=2500)
-            
-            # Clean response to extract JSON
-            response = response.strip()
-            if response.startswith("```json"):
-                response = response[7:]
-            if response.endswith("```"):
-                response = response[:-3]
-            response = response.strip()
-            
-            # Try to parse JSON response
-            try:
-                flashcards_data = json.loads(response)
-                if isinstance(flashcards_data, list) and len(flashcards_data) > 0:
-                    # Validate structure
-                    valid_cards = []
-                    for card in flashcards_data:
-                        if isinstance(card, dict) and 'question' in card and 'answer' in card:
-                            # Ensure all required fields
-                            valid_card = {
-                                'question': str(card.get('question', '')),
-                                'answer': str(card.get('answer', '')),
-                                'difficulty': card.get('difficulty', 'Basic'),
-                                'category': card.get('category', 'General'),
-                                'hint': card.get('hint', '')
-                            }
-                            valid_cards.append(valid_card)
-                    
-                    if valid_cards:
-                        print(f"✅ Generated {len(valid_cards)} flashcards")
-                        return valid_cards
-            except json.JSONDecodeError as e:
-                print(f"❌ JSON parsing failed: {e}")
-                print(f"Response: {response[:200]}...")
-            
-            # Fallback: generate basic flashcards
-            return self._generate_basic_flashcards(text, num_cards)
+            return self._validate_card(json.loads(line))
+        except json.JSONDecodeError:
+            print(f"⚠️ Skipping malformed flashcard line: {line[:100]}")
+            return None
+
+    def _parse_flashcards(self, response: str) -> List[Dict]:
+        """Parse the model's JSON array, returning [] if the response is unusable"""
+        if response.startswith("❌"):
+            print(response)
+            return []
         
-        except Exception as e:
-            print(f"❌ Flashcard generation error: {e}")
-            return self._generate_basic_flashcards(text, num_cards)
+        # Clean response to extract JSON
+        response = response.strip()
+        if response.startswith("```json"):
+            response = response[7:]
+        if response.endswith("```"):
+            response = response[:-3]
+        response = response.strip()
+        
+        # Try to parse JSON response
+        try:
+            flashcards_data = json.loads(response)
+            if isinstance(flashcards_data, list) and len(flashcards_data) > 0:
+                # Validate structure
+                valid_cards = []
+                for card in flashcards_data:
+                    # Ensure all required fields
+                    valid_card = self._validate_card(card)
+                    if valid_card:
+                        valid_cards.append(valid_card)
+                
+                if valid_cards:
+                    print(f"✅ Generated {len(valid_cards)} flashcards")
+                    return valid_cards
+        except json.JSONDecodeError as e:
+            print(f"❌ JSON parsing failed: {e}")
+            print(f"Response: {response[:200]}...")
+        
+        return []
     
     def _generate_basic_flashcards(self, text: str, num_cards: int) -> List[Dict]:
         """Generate basic flashcards as fallback"""
@@ -392,18 +776,62 @@ class QuizAgent:
 
     def generate_quiz_structured(self, text: str, num_questions=8) -> List[Dict]:
         """Generate structured quiz data for the app interface"""
-        if not text.strip():
+        text = self._prepare_text(text)
+        if text is None:
             return []
         
-        if len(text.split()) < 30:
+        try:
+            response = self.client.chat_completion(
+                [{"role": "user", "content": self._build_prompt(text, num_questions)}],
+                max_tokens=self._max_tokens(num_questions)
+            )
+            return self._parse_quiz(response) or self._generate_basic_quiz(text, num_questions)
+        
+        except Exception as e:
+            print(f"❌ Quiz generation error: {e}")
+            return self._generate_basic_quiz(text, num_questions)
+
+    async def agenerate_quiz_structured(self, text: str, num_questions=8) -> List[Dict]:
+        """Async variant of generate_quiz_structured.
+        
+        Returns [] instead of a basic quiz when generation fails, so callers
+        can tell AI output from fallback content.
+        """
+        text = self._prepare_text(text)
+        if text is None:
             return []
         
+        try:
+            response = await self.client.achat_completion(
+                [{"role": "user", "content": self._build_prompt(text, num_questions)}],
+                max_tokens=self._max_tokens(num_questions)
+            )
+            return self._parse_quiz(response)
+        
+        except Exception as e:
+            print(f"❌ Quiz generation error: {e}")
+            return []
+
+    def _prepare_text(self, text: str) -> str:
+        """Return the text truncated for the prompt, or None if there is too little content"""
+        if not text.strip():
+            return None
+        
+        if len(text.split()) < 30:
+            return None
+        
         # Truncate text if too long
         max_chars = 7000
         if len(text) > max_chars:
             text = text[:max_chars] + "..."
-        
-        prompt = f"""Create {num_questions} multiple choice questions based on the following content. Return ONLY a valid JSON array with no additional text.
+        return text
+
+    def _max_tokens(self, num_questions: int) -> int:
+        # All questions come back in one JSON array, so budget tokens per question to avoid truncated JSON
+        return min(350 * num_questions + 200, 6000)
+
+    def _build_prompt(self, text: str, num_questions: int) -> str:
+        return f"""Create exactly {num_questions} multiple choice questions based on the following content. Return ONLY a valid JSON array with no additional text.
 
 Content:
 {text}
@@ -432,56 +860,54 @@ Guidelines:
 - Mix difficulty: Basic, Intermediate, Advanced
 - correct_answer should be the index (0-3) of the correct option
 - Provide educational explanations"""
+
+    def _parse_quiz(self, response: str) -> List[Dict]:
+        """Parse the model's JSON array, returning [] if the response is unusable"""
+        if response.startswith("❌"):
+            print(response)
+            return []
+        
+        # Clean response to extract JSON
+        response = response.strip()
+        if response.startswith("```json"):
+            response = response[7:]
+        if response.endswith("```"):
+            response = response[:-3]
+        response = response.strip()
         
+        # Try to parse JSON response
         try:
-            response = self.client.chat_completion([{"role": "user", "content": prompt}], max_tokens=3000)
-            
-            # Clean response to extract JSON
-            response = response.strip()
-            if response.startswith("```json"):
-                response = response[7:]
-            if response.endswith("```"):
-                response = response[:-3]
-            response = response.strip()
-            
-            # Try to parse JSON response
-            try:
-                quiz_data = json.loads(response)
-                if isinstance(quiz_data, list) and len(quiz_data) > 0:
-                    # Validate structure
-                    valid_questions = []
-                    for q in quiz_data:
-                        if (isinstance(q, dict) and 'question' in q and 'options' in q 
-                            and 'correct_answer' in q and isinstance(q['options'], list) 
-                            and len(q['options']) == 4):
-                            
-                            # Ensure valid correct_answer index
-                            correct_idx = q.get('correct_answer', 0)
-                            if not isinstance(correct_idx, int) or correct_idx < 0 or correct_idx > 3:
-                                correct_idx = 0
-                            
-                            valid_question = {
-                                'question': str(q.get('question', '')),
-                                'options': [str(opt) for opt in q['options'][:4]],
-                                'correct_answer': correct_idx,
-                                'explanation': str(q.get('explanation', 'No explanation provided')),
-                                'difficulty': q.get('difficulty', 'Basic')
-                            }
-                            valid_questions.append(valid_question)
-                    
-                    if valid_questions:
-                        print(f"✅ Generated {len(valid_questions)} quiz questions")
-                        return valid_questions
-            except json.JSONDecodeError as e:
-                print(f"❌ JSON parsing failed: {e}")
-                print(f"Response: {response[:200]}...")
-            
-            # Fallback: generate basic quiz
-            return self._generate_basic_quiz(text, num_questions)
+            quiz_data = json.loads(response)
+            if isinstance(quiz_data, list) and len(quiz_data) > 0:
+                # Validate structure
+                valid_questions = []
+                for q in quiz_data:
+                    if (isinstance(q, dict) and 'question' in q and 'options' in q 
+                        and 'correct_answer' in q and isinstance(q['options'], list) 
+                        and len(q['options']) == 4):
+                        
+                        # Ensure valid correct_answer index
+                        correct_idx = q.get('correct_answer', 0)
+                        if not isinstance(correct_idx, int) or correct_idx < 0 or correct_idx > 3:
+                            correct_idx = 0
+                        
+                        valid_question = {
+                            'question': str(q.get('question', '')),
+                            'options': [str(opt) for opt in q['options'][:4]],
+                            'correct_answer': correct_idx,
+                            'explanation': str(q.get('explanation', 'No explanation provided')),
+                            'difficulty': str(q.get('difficulty') or 'Basic')
+                        }
+                        valid_questions.append(valid_question)
+                
+                if valid_questions:
+                    print(f"✅ Generated {len(valid_questions)} quiz questions")
+                    return valid_questions
+        except json.JSONDecodeError as e:
+            print(f"❌ JSON parsing failed: {e}")
+            print(f"Response: {response[:200]}...")
         
-        except Exception as e:
-            print(f"❌ Quiz generation error: {e}")
-            return self._generate_basic_quiz(text, num_questions)
+        return []
     
     def _generate_basic_quiz(self, text: str, num_questions: int) -> List[Dict]:
         """Generate basic quiz as fallback"""
@@ -514,6 +940,7 @@ Guidelines:
 class EnhancedResearchDiscoveryAgent:
     def __init__(self, client):
         self.client = client
+        self.keyword_extractor = yake.KeywordExtractor(lan="en", n=2, top=30)
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
@@ -586,6 +1013,54 @@ Avoid generic terms like "study", "research", "analysis" unless they're part of
             print(f"❌ Error in keyword extraction: {e}")
             return self._fallback_keyword_extraction(analysis_text)
 
+    def extract_local_keywords(self, text: str) -> List[str]:
+        """Extract keyphrases locally with YAKE, most relevant first"""
+        # Drop the page markers added during PDF extraction
+        text = re.sub(r'--- Page \d+(?: \(OCR\))? ---', ' ', text)
+        
+        keywords = []
+        seen_words = []
+        for keyword, score in self.keyword_extractor.extract_keywords(text):
+            words = set(keyword.lower().split())
+            # Skip terms already covered by a higher-ranked phrase (e.g. "learning" after "machine learning")
+            if any(words <= seen for seen in seen_words):
+                continue
+            keywords.append(keyword)
+            seen_words.append(words)
+        return keywords
+
+    async def aextract_keywords_and_topic(self, text: str, label_topic: bool = True, label_timeout: float = 10.0) -> Tuple[str, List[str], List[str]]:
+        """Fast keyword extraction: YAKE for keywords, a short LLM call only to label the topic.
+        
+        The label call gets one attempt within `label_timeout` seconds; if it fails
+        the top keyword is used as the topic, so the local keywords are never lost.
+        """
+        if not text.strip():
+            return "Academic Study Material", ["study", "learning"], []
+        
+        analysis_text = text[:6000]
+        keywords = await asyncio.to_thread(self.extract_local_keywords, analysis_text)
+        if not keywords:
+            return self._fallback_keyword_extraction(analysis_text)
+        
+        topic = keywords[0].title()
+        if label_topic:
+            prompt = f"Label the academic topic given these keywords: {', '.join(keywords[:12])}. Reply with only the topic name."
+            try:
+                response = await asyncio.wait_for(
+                    self.client.achat_completion([{"role": "user", "content": prompt}], max_tokens=40, retry_count=1),
+                    timeout=label_timeout
+                )
+                if not response.startswith("❌"):
+                    topic = response.strip().strip('"').strip()
+            except asyncio.TimeoutError:
+                print("⏱️ Topic labelling timed out, using top keyword")
+        
+        print(f"✅ Local extraction - Topic: {topic}")
+        print(f"✅ Research keywords: {keywords[:6]}")
+        
+        return topic, keywords[:6], keywords[:10]
+
     def _fallback_keyword_extraction(self, text: str) -> Tuple[str, List[str], List[str]]:
         """Fallback keyword extraction using text analysis"""
         # Extract potential academic terms (capitalized words, technical terms)
@@ -613,13 +1088,19 @@ Avoid generic terms like "study", "research", "analysis" unless they're part of
         
         return topic, top_keywords[:6], top_keywords
 
-    def find_papers(self, text: str, max_papers: int = 8) -> List[Dict]:
-        """Enhanced paper finding with smarter keyword extraction"""
+    def find_papers(self, text: str, max_papers: int = 8, extracted_keywords: Tuple[str, List[str], List[str]] = None) -> List[Dict]:
+        """Enhanced paper finding with smarter keyword extraction
+        
+        Pass a precomputed (topic, research_keywords, all_keywords) tuple as
+        `extracted_keywords` to skip the extraction step.
+        """
         if not text.strip():
             return []
         
         # Extract enhanced keywords
-        topic, research_keywords, all_keywords = self.extract_smart_keywords_and_topic(text)
+        if extracted_keywords is None:
+            extracted_keywords = self.extract_smart_keywords_and_topic(text)
+        topic, research_keywords, all_keywords = extracted_keywords
         
         papers = []
         
@@ -91,17 +91,11 @@ export function FileUpload() {
       const quizResult = await apiService.generateQuiz();
       dispatch({ type: 'SET_QUIZ', payload: quizResult.quiz });
 
-      // Discover research papers
-      const researchResult = await apiService.discoverResearch();
-      dispatch({ type: 'SET_RESEARCH_PAPERS', payload: researchResult.papers });
-
-      // Discover YouTube videos
-      const videosResult = await apiService.discoverVideos();
-      dispatch({ type: 'SET_YOUTUBE_VIDEOS', payload: videosResult.videos });
-
-      // Discover web resources
-      const resourcesResult = await apiService.discoverResources();
-      dispatch({ type: 'SET_WEB_RESOURCES', payload: resourcesResult.resources });
+      // Discover research papers, YouTube videos and web resources
+      const discoveryResult = await apiService.discoverAll();
+      dispatch({ type: 'SET_RESEARCH_PAPERS', payload: discoveryResult.papers });
+      dispatch({ type: 'SET_YOUTUBE_VIDEOS', payload: discoveryResult.videos });
+      dispatch({ type: 'SET_WEB_RESOURCES', payload: discoveryResult.resources });
 
     } catch (error: any) {
       const errorMessage = error.response?.data?.detail || error.message || 'Failed to generate materials';
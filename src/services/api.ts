@@ -90,6 +90,12 @@ export const apiService = {
     return response.data;
   },
 
+  // Discover papers, videos and web resources in one request
+  async discoverAll(sessionId: string = 'default'): Promise<{ papers: ResearchPaper[]; videos: YouTubeVideo[]; resources: WebResource[]; status: string }> {
+    const response = await api.post(`/discover-all?session_id=${sessionId}`);
+    return response.data;
+  },
+
   // Ask question
   async askQuestion(question: string, documentText: string): Promise<{ answer: string; status: string }> {
     const response = await api.post('/ask-question', {